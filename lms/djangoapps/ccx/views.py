@@ -553,7 +553,7 @@ def ccx_grades_csv(request, course, ccx=None):
             courseenrollment__course_id=ccx_key,
             courseenrollment__is_active=1
         ).order_by('username').select_related("profile")
-        grades = CourseGradeFactory().iter(enrolled_students, course)
+        grades = CourseGradeFactory().iter(enrolled_students.iterator(), course)
 
         header = None
         rows = []
@@ -14,7 +14,7 @@ from base64 import b64encode
 from collections import namedtuple
 from hashlib import sha1
 
-from django.db import models
+from django.db import IntegrityError, connection, models, transaction
 from django.utils.timezone import now
 from lazy import lazy
 from model_utils.models import TimeStampedModel
@@ -400,6 +400,16 @@ class PersistentSubsectionGrade(DeleteGradesMixin, TimeStampedModel):
             course_id=course_key,
         )
 
+    @classmethod
+    def bulk_read_user_ids(cls, course_key, user_ids):
+        """
+        Returns the set of ids, among the given user_ids, of
+        users with any grades in the given course.
+        """
+        return set(
+            cls.objects.filter(course_id=course_key, user_id__in=user_ids).values_list('user_id', flat=True).distinct()
+        )
+
     @classmethod
     def update_or_create_grade(cls, **params):
         """
@@ -569,6 +579,12 @@ class PersistentCourseGrade(DeleteGradesMixin, TimeStampedModel):
 
     CACHE_NAMESPACE = u"grades.models.PersistentCourseGrade"
 
+    # Fields loaded when reading grades, as needed to
+    # validate, represent, and log the grades.
+    READ_FIELDS = (
+        'user_id', 'course_version', 'grading_policy_hash', 'percent_grade', 'letter_grade', 'passed_timestamp',
+    )
+
     def __unicode__(self):
         """
         Returns a string representation of this model.
@@ -594,9 +610,16 @@ class PersistentCourseGrade(DeleteGradesMixin, TimeStampedModel):
         get_cache(cls.CACHE_NAMESPACE)[cls._cache_key(course_id)] = {
             grade.user_id: grade
             for grade in
-            cls.objects.filter(user_id__in=[user.id for user in users], course_id=course_id)
+            cls.objects.filter(user_id__in=[user.id for user in users], course_id=course_id).only(*cls.READ_FIELDS)
         }
 
+    @classmethod
+    def clear_prefetched_data(cls, course_id):
+        """
+        Clears prefetched grades for the given course.
+        """
+        get_cache(cls.CACHE_NAMESPACE).pop(cls._cache_key(course_id), None)
+
     @classmethod
     def read(cls, user_id, course_id):
         """
@@ -618,7 +641,7 @@ class PersistentCourseGrade(DeleteGradesMixin, TimeStampedModel):
                 raise cls.DoesNotExist
         except KeyError:
             # grades were not prefetched for the course, so fetch it
-            return cls.objects.get(user_id=user_id, course_id=course_id)
+            return cls.objects.only(*cls.READ_FIELDS).get(user_id=user_id, course_id=course_id)
 
     @classmethod
     def update_or_create(cls, user_id, course_id, **kwargs):
@@ -642,6 +665,116 @@ class PersistentCourseGrade(DeleteGradesMixin, TimeStampedModel):
         cls._emit_grade_calculated_event(grade)
         return grade
 
+    @classmethod
+    def bulk_update_or_create(cls, course_id, grade_params_list):
+        """
+        Creates or updates the course grades for the given list of
+        grade params (each including a user_id) in the given course.
+        Existing grades are read with a single query and all new
+        grades are inserted with a single query.  On MySQL, all grades
+        are instead upserted with a single query.
+        Returns the list of PersistentCourseGrade objects.
+        """
+        if not grade_params_list:
+            return []
+        if connection.vendor == 'mysql':
+            return cls._bulk_upsert(course_id, grade_params_list)
+
+        existing_grades = {
+            grade.user_id: grade
+            for grade in
+            cls.objects.filter(user_id__in=[params['user_id'] for params in grade_params_list], course_id=course_id)
+        }
+        timestamp = now()
+        grades, new_grade_params = [], []
+        for params in grade_params_list:
+            grade = existing_grades.get(params['user_id'])
+            if grade is None:
+                new_grade_params.append(params)
+                continue
+
+            params = dict(params)
+            passed = params.pop('passed')
+            params['course_version'] = params.get('course_version', None) or ""
+            for field_name, value in params.iteritems():
+                setattr(grade, field_name, value)
+            if passed and not grade.passed_timestamp:
+                grade.passed_timestamp = timestamp
+            grade.save()
+            cls._emit_grade_calculated_event(grade)
+            grades.append(grade)
+
+        new_grades = []
+        for params in new_grade_params:
+            params = dict(params)
+            passed = params.pop('passed')
+            params['course_version'] = params.get('course_version', None) or ""
+            new_grades.append(cls(course_id=course_id, passed_timestamp=timestamp if passed else None, **params))
+        try:
+            with transaction.atomic():
+                cls.objects.bulk_create(new_grades)
+        except IntegrityError:
+            # Some of these grades were concurrently created elsewhere,
+            # so fall back to creating or updating them one at a time.
+            return grades + [cls.update_or_create(course_id=course_id, **dict(params)) for params in new_grade_params]
+
+        for grade in new_grades:
+            cls._emit_grade_calculated_event(grade)
+        return grades + new_grades
+
+    @classmethod
+    def _bulk_upsert(cls, course_id, grade_params_list):
+        """
+        Creates or updates the course grades for the given list of grade
+        params in the given course, with a single MySQL
+        INSERT ... ON DUPLICATE KEY UPDATE statement.
+        Returns the list of PersistentCourseGrade objects, as written
+        rather than as read back from the database.
+        """
+        timestamp = now()
+        grades = []
+        for params in grade_params_list:
+            params = dict(params)
+            passed = params.pop('passed')
+            params['course_version'] = params.get('course_version', None) or ""
+            grades.append(cls(
+                course_id=course_id,
+                created=timestamp,
+                modified=timestamp,
+                passed_timestamp=timestamp if passed else None,
+                **params
+            ))
+
+        quote_name = connection.ops.quote_name
+        fields = [field for field in cls._meta.concrete_fields if not field.primary_key]
+        updates = [
+            u'{column} = VALUES({column})'.format(column=quote_name(field.column))
+            for field in fields
+            if field.name not in ('user_id', 'course_id', 'created', 'passed_timestamp')
+        ]
+        # Keep the timestamp of when the learner first passed, if any.
+        updates.append(u'{column} = COALESCE({column}, VALUES({column}))'.format(
+            column=quote_name(cls._meta.get_field('passed_timestamp').column),
+        ))
+        row_placeholder = u'({})'.format(u', '.join([u'%s'] * len(fields)))
+        sql = u'INSERT INTO {table} ({columns}) VALUES {rows} ON DUPLICATE KEY UPDATE {updates}'.format(
+            table=quote_name(cls._meta.db_table),
+            columns=u', '.join(quote_name(field.column) for field in fields),
+            rows=u', '.join([row_placeholder] * len(grades)),
+            updates=u', '.join(updates),
+        )
+        sql_params = [
+            field.get_db_prep_save(getattr(grade, field.attname), connection)
+            for grade in grades
+            for field in fields
+        ]
+        with connection.cursor() as cursor:
+            cursor.execute(sql, sql_params)
+
+        for grade in grades:
+            cls._emit_grade_calculated_event(grade)
+        return grades
+
     @staticmethod
     def _emit_grade_calculated_event(grade):
         """
@@ -1,3 +1,5 @@
+from lazy import lazy
+
 from lms.djangoapps.course_blocks.api import get_course_blocks
 from openedx.core.djangoapps.content.block_structure.api import get_block_structure_manager
 from xmodule.modulestore.django import modulestore
@@ -26,6 +28,25 @@ class CourseData(object):
         self._course_key = course_key
         self._location = None
 
+    def for_user(self, user):
+        """
+        Returns a CourseData for the given user in this course, sharing
+        this instance's course, collected structure, and course-level
+        properties so they are retrieved and computed only once.
+        """
+        course_data = CourseData(
+            user,
+            course=self.course,
+            collected_block_structure=self.collected_structure,
+            course_key=self.course_key,
+        )
+        # These properties are the same for all users, as they are
+        # read from the root of the course.
+        course_data.grading_policy_hash = self.grading_policy_hash
+        course_data.version = self.version
+        course_data.edited_on = self.edited_on
+        return course_data
+
     @property
     def course_key(self):
         if not self._course_key:
@@ -70,7 +91,7 @@ class CourseData(object):
             self._course = modulestore().get_course(self.course_key)
         return self._course
 
-    @property
+    @lazy
     def grading_policy_hash(self):
         structure = self._effective_structure
         if structure:
@@ -82,13 +103,13 @@ class CourseData(object):
         else:
             return GradesTransformer.grading_policy_hash(self.course)
 
-    @property
+    @lazy
     def version(self):
         structure = self._effective_structure
         course_block = structure[self.location] if structure else self.course
         return getattr(course_block, 'course_version', None)
 
-    @property
+    @lazy
     def edited_on(self):
         # get course block from structure only; subtree_edited_on field on modulestore's course block isn't optimized.
         structure = self._effective_structure
@@ -1,27 +1,102 @@
-from collections import namedtuple
-from contextlib import contextmanager
-from logging import getLogger
+from contextlib import closing, contextmanager
+from itertools import islice
+from logging import DEBUG, INFO, getLogger
+from time import time
 
 import dogstats_wrapper as dog_stats_api
+from django.db import transaction
+from lazy import lazy
 
 from openedx.core.djangoapps.signals.signals import COURSE_GRADE_CHANGED, COURSE_GRADE_NOW_PASSED
 
 from ..config import assume_zero_if_absent, should_persist_grades
 from ..config.waffle import WRITE_ONLY_IF_ENGAGED, waffle
-from ..models import PersistentCourseGrade, VisibleBlocks
+from ..models import PersistentCourseGrade, PersistentSubsectionGrade, VisibleBlocks
 from .course_data import CourseData
 from .course_grade import CourseGrade, ZeroCourseGrade
 
 log = getLogger(__name__)
 
 
+class GradeResult(object):
+    """
+    The result of grading a student, as yielded by CourseGradeFactory.iter.
+    Unpacks, like a tuple, into (student, course_grade, error).
+    """
+    __slots__ = ('student', 'course_grade', 'error')
+
+    def __init__(self, student, course_grade, error):
+        self.student = student
+        self.course_grade = course_grade
+        self.error = error
+
+    def __iter__(self):
+        return iter((self.student, self.course_grade, self.error))
+
+
+class _GradesConfig(object):
+    """
+    Lazily looks up, and caches, the grades configuration for a course.
+    """
+    def __init__(self, course_key):
+        self.course_key = course_key
+
+    @lazy
+    def persist(self):
+        """
+        Returns whether grades are persisted for the course.
+        """
+        return should_persist_grades(self.course_key)
+
+    @lazy
+    def assume_zero(self):
+        """
+        Returns whether absent grades are assumed to be zero for the course.
+        """
+        return assume_zero_if_absent(self.course_key)
+
+    @lazy
+    def write_only_if_engaged(self):
+        """
+        Returns whether grades are only persisted for students who attempted the course.
+        """
+        return waffle().is_enabled(WRITE_ONLY_IF_ENGAGED)
+
+
 class CourseGradeFactory(object):
     """
     Factory class to create Course Grade objects.
     """
-    GradeResult = namedtuple('GradeResult', ['student', 'course_grade', 'error'])
+    GradeResult = GradeResult
+
+    # iter reports the time taken to grade one of every so many students.
+    ITER_TIMING_SAMPLE_INTERVAL = 50
+
+    def __init__(self):
+        # While iterating over a course's students, persistence of
+        # course grades, and the signals sent about them, are deferred
+        # so they can be processed in batches.
+        self._defer_persistence = False
+        self._unsaved_course_grades = []
+        self._unsignaled_course_grades = []
+        # While iterating over a course's students, its grades
+        # configuration is looked up only once.
+        self._iter_config = None
+        # While iterating over a course's students, the current batch of
+        # them, and the ids of those in it with any persisted subsection
+        # grades, looked up once a grade in the batch is to be computed.
+        self._user_batch = None
+        self._graded_user_ids = None
 
-    def create(self, user, course=None, collected_block_structure=None, course_structure=None, course_key=None):
+    def create(
+            self,
+            user,
+            course=None,
+            collected_block_structure=None,
+            course_structure=None,
+            course_key=None,
+            course_data=None,
+    ):
         """
         Returns the CourseGrade for the given user in the course.
         Reads the value from storage and validates that the grading
@@ -30,22 +105,32 @@ class CourseGradeFactory(object):
         Else, if changed or not in storage, computes and returns a new value.
 
         At least one of course, collected_block_structure, course_structure,
-        or course_key should be provided.
+        course_key, or course_data (for the given user) should be provided.
         """
-        course_data = CourseData(user, course, collected_block_structure, course_structure, course_key)
+        course_data = course_data or CourseData(user, course, collected_block_structure, course_structure, course_key)
+        config = self._config(course_data.course_key)
         try:
-            course_grade, read_policy_hash = self._read(user, course_data)
-            if read_policy_hash == course_data.grading_policy_hash:
-                return course_grade
-            read_only = False  # update the persisted grade since the policy changed; TODO(TNL-6786) remove soon
+            persistent_grade = self._read_persistent_grade(user, course_data, config)
         except PersistentCourseGrade.DoesNotExist:
-            if assume_zero_if_absent(course_data.course_key):
+            if config.assume_zero:
                 return self._create_zero(user, course_data)
             read_only = True  # keep the grade un-persisted; TODO(TNL-6786) remove once all grades are backfilled
+        else:
+            if persistent_grade.grading_policy_hash == course_data.grading_policy_hash:
+                return self._read(user, course_data, persistent_grade)
+            read_only = False  # update the persisted grade since the policy changed; TODO(TNL-6786) remove soon
 
-        return self._update(user, course_data, read_only)
+        return self._update(user, course_data, read_only, config)
 
-    def read(self, user, course=None, collected_block_structure=None, course_structure=None, course_key=None):
+    def read(
+            self,
+            user,
+            course=None,
+            collected_block_structure=None,
+            course_structure=None,
+            course_key=None,
+            course_data=None,
+    ):
         """
         Returns the CourseGrade for the given user in the course as
         persisted in storage.  Does NOT verify whether the grading
@@ -54,36 +139,63 @@ class CourseGradeFactory(object):
         else returns None.
 
         At least one of course, collected_block_structure, course_structure,
-        or course_key should be provided.
+        course_key, or course_data (for the given user) should be provided.
         """
-        course_data = CourseData(user, course, collected_block_structure, course_structure, course_key)
+        course_data = course_data or CourseData(user, course, collected_block_structure, course_structure, course_key)
+        config = self._config(course_data.course_key)
         try:
-            course_grade, _ = self._read(user, course_data)
-            return course_grade
+            persistent_grade = self._read_persistent_grade(user, course_data, config)
+            return self._read(user, course_data, persistent_grade)
         except PersistentCourseGrade.DoesNotExist:
-            if assume_zero_if_absent(course_data.course_key):
+            if config.assume_zero:
                 return self._create_zero(user, course_data)
             else:
                 return None
 
-    def update(self, user, course=None, collected_block_structure=None, course_structure=None, course_key=None):
+    def update(
+            self,
+            user,
+            course=None,
+            collected_block_structure=None,
+            course_structure=None,
+            course_key=None,
+            course_data=None,
+    ):
         """
         Computes, updates, and returns the CourseGrade for the given
         user in the course.
 
         At least one of course, collected_block_structure, course_structure,
-        or course_key should be provided.
+        course_key, or course_data (for the given user) should be provided.
         """
-        course_data = CourseData(user, course, collected_block_structure, course_structure, course_key)
-        return self._update(user, course_data, read_only=False)
+        course_data = course_data or CourseData(user, course, collected_block_structure, course_structure, course_key)
+        return self._update(user, course_data, read_only=False, config=self._config(course_data.course_key))
 
     @contextmanager
-    def _course_transaction(self, course_key):
+    def _course_cache_scope(self, course_key):
         """
-        Provides a transaction context in which GradeResults are created.
+        Scopes the course's cached grading data to the creation of its
+        GradeResults, clearing it even if iteration fails or is abandoned
+        early.
+
+        No database transaction is held open here: _flush_persistent_grades
+        saves each batch in its own transaction, falling back to one per
+        student so one bad student doesn't roll back the batch.
         """
-        yield
-        VisibleBlocks.clear_cache(course_key)
+        try:
+            yield
+        finally:
+            VisibleBlocks.clear_cache(course_key)
+            PersistentCourseGrade.clear_prefetched_data(course_key)
+
+    def _config(self, course_key):
+        """
+        Returns the grades configuration for the given course, reusing
+        the one shared by all students while iterating over the course.
+        """
+        if self._iter_config is not None and self._iter_config.course_key == course_key:
+            return self._iter_config
+        return _GradesConfig(course_key)
 
     def iter(
             self,
@@ -92,15 +204,51 @@ class CourseGradeFactory(object):
             collected_block_structure=None,
             course_key=None,
             force_update=False,
+            batch_size=200,
     ):
         """
         Given a course and an iterable of students (User), yield a GradeResult
-        for every student enrolled in the course.  GradeResult is a named tuple of:
+        for every student enrolled in the course.  GradeResult unpacks into:
 
             (student, course_grade, err_msg)
 
         If an error occurred, course_grade will be None and err_msg will be an
         exception message. If there was no error, err_msg is an empty string.
+
+        The results are those of iter_pages, yielded one at a time.
+        """
+        pages = self.iter_pages(
+            users,
+            course=course,
+            collected_block_structure=collected_block_structure,
+            course_key=course_key,
+            force_update=force_update,
+            batch_size=batch_size,
+        )
+        with closing(pages):
+            for page in pages:
+                for grade_result in page:
+                    yield grade_result
+
+    def iter_pages(
+            self,
+            users,
+            course=None,
+            collected_block_structure=None,
+            course_key=None,
+            force_update=False,
+            batch_size=200,
+    ):
+        """
+        Given a course and an iterable of students (User), yield lists of
+        at most batch_size GradeResults, one for every student enrolled in
+        the course.
+
+        Each page is graded together, prefetching its students' persisted
+        grades, and is yielded only once its computed grades are saved and
+        their signals sent. users is consumed only once and one page at a
+        time, so pass a QuerySet as users.iterator() to avoid caching every
+        User row in memory.
         """
         # Pre-fetch the collected course_structure so:
         # 1. Correctness: the same version of the course is used to
@@ -111,47 +259,166 @@ class CourseGradeFactory(object):
             user=None, course=course, collected_block_structure=collected_block_structure, course_key=course_key,
         )
         stats_tags = [u'action:{}'.format(course_data.course_key)]
-        with self._course_transaction(course_data.course_key):
-            for user in users:
-                with dog_stats_api.timer('lms.grades.CourseGradeFactory.iter', tags=stats_tags):
-                    yield self._iter_grade_result(user, course_data, force_update)
+        graded_count = 0
+        grade_method = self.update if force_update else self.create
+        with self._course_cache_scope(course_data.course_key):
+            self._defer_persistence = True
+            self._iter_config = _GradesConfig(course_data.course_key)
+            try:
+                for user_batch in self._batch_users(users, batch_size):
+                    # Resolve the collected structure outside of the per-student
+                    # error handling, so that a failure to retrieve it is raised
+                    # once rather than retried for every student.
+                    _ = course_data.collected_structure
+                    if not force_update and self._iter_config.persist:
+                        PersistentCourseGrade.prefetch(course_data.course_key, user_batch)
+                    self._user_batch, self._graded_user_ids = user_batch, None
+                    page = []
+                    for user in user_batch:
+                        start_time = time()
+                        page.append(self._iter_grade_result(user, course_data, grade_method))
+                        if graded_count % self.ITER_TIMING_SAMPLE_INTERVAL == 0:
+                            dog_stats_api.histogram(
+                                'lms.grades.CourseGradeFactory.iter', time() - start_time, tags=stats_tags,
+                            )
+                        graded_count += 1
+                    errors = self._flush_persistent_grades(course_data.course_key)
+                    if errors:
+                        page = [
+                            self.GradeResult(grade_result.student, None, errors[grade_result.student.id])
+                            if grade_result.student.id in errors else grade_result
+                            for grade_result in page
+                        ]
+                    yield page
+            finally:
+                self._defer_persistence = False
+                self._iter_config = None
+                self._user_batch, self._graded_user_ids = None, None
+                self._flush_persistent_grades(course_data.course_key)
 
-    def _iter_grade_result(self, user, course_data, force_update):
+    @staticmethod
+    def _batch_users(users, batch_size):
+        """
+        Returns a generator of lists of at most batch_size users.
+        """
+        users = iter(users)
+        user_batch = list(islice(users, batch_size))
+        while user_batch:
+            yield user_batch
+            user_batch = list(islice(users, batch_size))
+
+    def _iter_grade_result(self, user, course_data, grade_method):
         try:
-            method = CourseGradeFactory().update if force_update else CourseGradeFactory().create
-            course_grade = method(
-                user, course_data.course, course_data.collected_structure, course_key=course_data.course_key,
-            )
+            course_grade = grade_method(user, course_data=course_data.for_user(user))
             return self.GradeResult(user, course_grade, None)
         except Exception as exc:  # pylint: disable=broad-except
             # Keep marching on even if this student couldn't be graded for
             # some reason, but log it for future reference.
-            log.exception(
-                'Cannot grade student %s in course %s because of exception: %s',
-                user.id,
-                course_data.course_key,
-                exc.message
-            )
+            self._log_grade_error(user, course_data.course_key, exc)
             return self.GradeResult(user, None, exc)
 
+    @staticmethod
+    def _log_grade_error(user, course_key, exc):
+        """
+        Logs that the given student couldn't be graded.  The traceback is
+        only formatted when debugging, since a misconfigured course can
+        make every student in it fail.
+        """
+        log_func = log.exception if log.isEnabledFor(DEBUG) else log.warning
+        log_func(
+            u'Cannot grade student %s in course %s because of exception: %s',
+            user.id,
+            course_key,
+            exc,
+        )
+
+    def _flush_persistent_grades(self, course_key):
+        """
+        Saves all the course grades whose persistence was deferred,
+        in a single transaction, and then sends all deferred signals.
+        If that transaction fails, each grade is saved in its own
+        transaction instead, and grades that still fail are not signaled.
+        Returns a dict mapping the ids of those grades' users to the
+        exception raised while saving them.
+        """
+        unsaved_course_grades, self._unsaved_course_grades = self._unsaved_course_grades, []
+        unsignaled_course_grades, self._unsignaled_course_grades = self._unsignaled_course_grades, []
+
+        errors = {}
+        if unsaved_course_grades:
+            try:
+                with transaction.atomic():
+                    for course_grade in unsaved_course_grades:
+                        course_grade._subsection_grade_factory.bulk_create_unsaved(clear=False)
+                    PersistentCourseGrade.bulk_update_or_create(
+                        course_key,
+                        [self._persistent_grade_params(course_grade) for course_grade in unsaved_course_grades],
+                    )
+            except Exception as exc:  # pylint: disable=broad-except
+                log.warning(
+                    u'Grades: Saving a batch of %d grades in course %s failed, saving them one at a time: %s',
+                    len(unsaved_course_grades),
+                    course_key,
+                    exc,
+                )
+                errors = self._persist_course_grades_individually(course_key, unsaved_course_grades)
+            else:
+                for course_grade in unsaved_course_grades:
+                    course_grade._subsection_grade_factory.clear_unsaved()
+        for course_grade in unsignaled_course_grades:
+            if course_grade.user.id not in errors:
+                self._send_course_grade_signals(course_grade)
+        return errors
+
+    def _persist_course_grades_individually(self, course_key, course_grades):
+        """
+        Saves each of the given course grades in its own transaction, so
+        that one student's grade failing to save doesn't roll back the others.
+        Returns a dict mapping the ids of the users whose grades failed to
+        save to the exception raised.
+        """
+        # The rolled back transaction may have cached visible blocks that were never saved.
+        VisibleBlocks.clear_cache(course_key)
+        errors = {}
+        for course_grade in course_grades:
+            try:
+                with transaction.atomic():
+                    course_grade._subsection_grade_factory.bulk_create_unsaved()
+                    PersistentCourseGrade.update_or_create(
+                        course_id=course_key, **self._persistent_grade_params(course_grade)
+                    )
+            except Exception as exc:  # pylint: disable=broad-except
+                VisibleBlocks.clear_cache(course_key)
+                self._log_grade_error(course_grade.user, course_key, exc)
+                errors[course_grade.user.id] = exc
+        return errors
+
     @staticmethod
     def _create_zero(user, course_data):
         """
         Returns a ZeroCourseGrade object for the given user and course.
         """
-        log.info(u'Grades: CreateZero, %s, User: %s', unicode(course_data), user.id)
+        if log.isEnabledFor(INFO):
+            log.info(u'Grades: CreateZero, %s, User: %s', unicode(course_data), user.id)
         return ZeroCourseGrade(user, course_data)
 
     @staticmethod
-    def _read(user, course_data):
+    def _read_persistent_grade(user, course_data, config):
         """
-        Returns a CourseGrade object based on stored grade information
-        for the given user and course.
+        Returns the stored grade information for the given user and course.
+        Raises PersistentCourseGrade.DoesNotExist if applicable
         """
-        if not should_persist_grades(course_data.course_key):
+        if not config.persist:
             raise PersistentCourseGrade.DoesNotExist
 
-        persistent_grade = PersistentCourseGrade.read(user.id, course_data.course_key)
+        return PersistentCourseGrade.read(user.id, course_data.course_key)
+
+    @staticmethod
+    def _read(user, course_data, persistent_grade):
+        """
+        Returns a CourseGrade object based on the given stored grade
+        information for the given user and course.
+        """
         course_grade = CourseGrade(
             user,
             course_data,
@@ -159,42 +426,96 @@ class CourseGradeFactory(object):
             persistent_grade.letter_grade,
             persistent_grade.passed_timestamp is not None,
         )
-        log.info(u'Grades: Read, %s, User: %s, %s', unicode(course_data), user.id, persistent_grade)
+        if log.isEnabledFor(INFO):
+            log.info(u'Grades: Read, %s, User: %s, %s', unicode(course_data), user.id, persistent_grade)
 
-        return course_grade, persistent_grade.grading_policy_hash
+        return course_grade
 
-    @staticmethod
-    def _update(user, course_data, read_only):
+    def _batch_graded_user_ids(self, course_key, config):
+        """
+        While iterating over a course's students, returns the ids of those
+        in the current batch with any persisted subsection grades, if only
+        those students may have non-zero grades worth computing.
+        Otherwise, returns None.
+        """
+        if self._user_batch is None or config is not self._iter_config:
+            return None
+        if self._graded_user_ids is None and config.assume_zero and config.write_only_if_engaged:
+            self._graded_user_ids = PersistentSubsectionGrade.bulk_read_user_ids(
+                course_key, [user.id for user in self._user_batch],
+            )
+        return self._graded_user_ids
+
+    def _update(self, user, course_data, read_only, config):
         """
         Computes, saves, and returns a CourseGrade object for the
         given user and course.
         Sends a COURSE_GRADE_CHANGED signal to listeners and a
         COURSE_GRADE_NOW_PASSED if learner has passed course.
         """
-        course_grade = CourseGrade(user, course_data)
-        course_grade.update()
+        graded_user_ids = self._batch_graded_user_ids(course_data.course_key, config)
+        if graded_user_ids is not None and user.id not in graded_user_ids:
+            # Absent subsection grades are assumed to be zero, so the
+            # course grade is zero, unattempted, and thus not persisted.
+            course_grade = ZeroCourseGrade(user, course_data)
+        else:
+            course_grade = CourseGrade(user, course_data)
+            course_grade.update()
 
         should_persist = (
             (not read_only) and  # TODO(TNL-6786) Remove the read_only boolean once all grades are back-filled.
-            should_persist_grades(course_data.course_key) and
-            (not waffle().is_enabled(WRITE_ONLY_IF_ENGAGED) or course_grade.attempted)
+            config.persist and
+            (not config.write_only_if_engaged or course_grade.attempted)
         )
-        if should_persist:
-            course_grade._subsection_grade_factory.bulk_create_unsaved()
-            PersistentCourseGrade.update_or_create(
-                user_id=user.id,
-                course_id=course_data.course_key,
-                course_version=course_data.version,
-                course_edited_timestamp=course_data.edited_on,
-                grading_policy_hash=course_data.grading_policy_hash,
-                percent_grade=course_grade.percent,
-                letter_grade=course_grade.letter_grade or "",
-                passed=course_grade.passed,
+        if self._defer_persistence:
+            # saved and signaled later by _flush_persistent_grades
+            if should_persist:
+                self._unsaved_course_grades.append(course_grade)
+            self._unsignaled_course_grades.append(course_grade)
+        else:
+            if should_persist:
+                course_grade._subsection_grade_factory.bulk_create_unsaved()
+                PersistentCourseGrade.update_or_create(
+                    course_id=course_data.course_key, **self._persistent_grade_params(course_grade)
+                )
+            self._send_course_grade_signals(course_grade)
+
+        if log.isEnabledFor(INFO):
+            # full_string() walks the collected structure, so only build it when it will be emitted.
+            log.info(
+                u'Grades: Update, %s, User: %s, %s, persisted: %s',
+                course_data.full_string(), user.id, course_grade, should_persist,
             )
 
+        return course_grade
+
+    @staticmethod
+    def _persistent_grade_params(course_grade):
+        """
+        Returns the fields, other than course_id, with which
+        to persist the given CourseGrade.
+        """
+        course_data = course_grade.course_data
+        return dict(
+            user_id=course_grade.user.id,
+            course_version=course_data.version,
+            course_edited_timestamp=course_data.edited_on,
+            grading_policy_hash=course_data.grading_policy_hash,
+            percent_grade=course_grade.percent,
+            letter_grade=course_grade.letter_grade or "",
+            passed=course_grade.passed,
+        )
+
+    @staticmethod
+    def _send_course_grade_signals(course_grade):
+        """
+        Sends a COURSE_GRADE_CHANGED signal to listeners and a
+        COURSE_GRADE_NOW_PASSED if learner has passed course.
+        """
+        course_data = course_grade.course_data
         COURSE_GRADE_CHANGED.send_robust(
             sender=None,
-            user=user,
+            user=course_grade.user,
             course_grade=course_grade,
             course_key=course_data.course_key,
             deadline=course_data.course.end,
@@ -202,13 +523,6 @@ class CourseGradeFactory(object):
         if course_grade.passed is True:
             COURSE_GRADE_NOW_PASSED.send_robust(
                 sender=CourseGradeFactory,
-                user=user,
+                user=course_grade.user,
                 course_key=course_data.course_key,
             )
-
-        log.info(
-            u'Grades: Update, %s, User: %s, %s, persisted: %s',
-            course_data.full_string(), user.id, course_grade, should_persist,
-        )
-
-        return course_grade
@@ -2,7 +2,7 @@
 SubsectionGrade Class
 """
 from collections import OrderedDict
-from logging import getLogger
+from logging import DEBUG, getLogger
 
 from lazy import lazy
 
@@ -106,7 +106,8 @@ class SubsectionGrade(SubsectionGradeBase):
             self._compute_block_score(descendant_key, course_structure, submissions_scores, csm_scores)
 
         self.all_total, self.graded_total = graders.aggregate_scores(self.problem_scores.values())
-        self._log_event(log.debug, u"init_from_structure", student)
+        if log.isEnabledFor(DEBUG):
+            self._log_event(log.debug, u"init_from_structure", student)
         return self
 
     def init_from_model(self, student, model, course_structure, submissions_scores, csm_scores):
@@ -128,7 +129,8 @@ class SubsectionGrade(SubsectionGradeBase):
             graded=False,
             first_attempted=model.first_attempted,
         )
-        self._log_event(log.debug, u"init_from_model", student)
+        if log.isEnabledFor(DEBUG):
+            self._log_event(log.debug, u"init_from_model", student)
         return self
 
     @classmethod
@@ -147,7 +149,8 @@ class SubsectionGrade(SubsectionGradeBase):
         Saves the subsection grade in a persisted model.
         """
         if self._should_persist_per_attempted:
-            self._log_event(log.debug, u"create_model", student)
+            if log.isEnabledFor(DEBUG):
+                self._log_event(log.debug, u"create_model", student)
             return PersistentSubsectionGrade.create_grade(**self._persisted_model_params(student))
 
     def update_or_create_model(self, student):
@@ -155,7 +158,8 @@ class SubsectionGrade(SubsectionGradeBase):
         Saves or updates the subsection grade in a persisted model.
         """
         if self._should_persist_per_attempted:
-            self._log_event(log.debug, u"update_or_create_model", student)
+            if log.isEnabledFor(DEBUG):
+                self._log_event(log.debug, u"update_or_create_model", student)
             return PersistentSubsectionGrade.update_or_create_grade(**self._persisted_model_params(student))
 
     @property
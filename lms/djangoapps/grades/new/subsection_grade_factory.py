@@ -1,5 +1,5 @@
 from collections import OrderedDict
-from logging import getLogger
+from logging import DEBUG, getLogger
 
 from lazy import lazy
 
@@ -34,9 +34,12 @@ class SubsectionGradeFactory(object):
 
         If read_only is True, doesn't save any updates to the grades.
         """
-        self._log_event(
-            log.debug, u"create, read_only: {0}, subsection: {1}".format(read_only, subsection.location), subsection,
-        )
+        if log.isEnabledFor(DEBUG):
+            self._log_event(
+                log.debug,
+                u"create, read_only: {0}, subsection: {1}".format(read_only, subsection.location),
+                subsection,
+            )
 
         subsection_grade = self._get_bulk_cached_grade(subsection)
         if not subsection_grade:
@@ -54,13 +57,23 @@ class SubsectionGradeFactory(object):
                         self._update_saved_subsection_grade(subsection.location, grade_model)
         return subsection_grade
 
-    def bulk_create_unsaved(self):
+    def bulk_create_unsaved(self, clear=True):
         """
         Bulk creates all the unsaved subsection_grades to this point.
+
+        If clear is False, the subsection_grades are kept, so they can be
+        created again should the enclosing transaction be rolled back.
         """
         SubsectionGrade.bulk_create_models(
             self.student, self._unsaved_subsection_grades.values(), self.course_data.course_key
         )
+        if clear:
+            self.clear_unsaved()
+
+    def clear_unsaved(self):
+        """
+        Forgets the unsaved subsection_grades, once they are known to be saved.
+        """
         self._unsaved_subsection_grades.clear()
 
     def update(self, subsection, only_if_higher=None):
@@ -115,7 +115,7 @@ def compute_grades_for_course(course_key, offset, batch_size, **kwargs):  # pyli
     """
 
     course = courses.get_course_by_id(CourseKey.from_string(course_key))
-    enrollments = CourseEnrollment.objects.filter(course_id=course.id).order_by('created')
+    enrollments = CourseEnrollment.objects.filter(course_id=course.id).order_by('created').select_related('user')
     student_iter = (enrollment.user for enrollment in enrollments[offset:offset + batch_size])
     for result in CourseGradeFactory().iter(users=student_iter, course=course, force_update=True):
         if result.error is not None:
@@ -11,6 +11,7 @@ from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
 from xmodule.modulestore.tests.factories import CourseFactory
 
 from ..new.course_data import CourseData
+from ..transformer import GradesTransformer
 
 
 class CourseDataTest(ModuleStoreTestCase):
@@ -77,6 +78,28 @@ class CourseDataTest(ModuleStoreTestCase):
             self.assertIn(u'Course: course_key', unicode(course_data))
             self.assertIn(u'Course: course_key', course_data.full_string())
 
+    def test_course_properties_computed_once(self):
+        course_data = CourseData(self.user, course=self.course)
+        with patch.object(
+            GradesTransformer,
+            'grading_policy_hash',
+            wraps=GradesTransformer.grading_policy_hash,
+        ) as mock_grading_policy_hash:
+            self.assertEquals(course_data.grading_policy_hash, course_data.grading_policy_hash)
+        self.assertEquals(mock_grading_policy_hash.call_count, 1)
+
+    def test_for_user(self):
+        course_data = CourseData(None, course=self.course, collected_block_structure=self.collected_structure)
+        user_course_data = course_data.for_user(self.user)
+        self.assertEquals(user_course_data.user, self.user)
+        self.assertEquals(user_course_data.course_key, self.course.id)
+        self.assertEquals(user_course_data.structure.root_block_usage_key, self.one_true_structure.root_block_usage_key)
+        with patch.object(GradesTransformer, 'grading_policy_hash') as mock_grading_policy_hash:
+            self.assertEquals(user_course_data.grading_policy_hash, course_data.grading_policy_hash)
+            self.assertEquals(user_course_data.version, course_data.version)
+            self.assertEquals(user_course_data.edited_on, course_data.edited_on)
+        self.assertFalse(mock_grading_policy_hash.called)
+
     def test_no_data(self):
         with self.assertRaises(ValueError):
             _ = CourseData(self.user)
@@ -6,6 +6,7 @@ import datetime
 import itertools
 
 import ddt
+from django.db import IntegrityError
 from mock import patch
 from nose.plugins.attrib import attr
 
@@ -20,12 +21,17 @@ from xmodule.modulestore import ModuleStoreEnum
 from xmodule.modulestore.tests.django_utils import SharedModuleStoreTestCase
 from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
 
+from ..config.waffle import ASSUME_ZERO_GRADE_IF_ABSENT, WRITE_ONLY_IF_ENGAGED, waffle
+from ..models import PersistentCourseGrade, PersistentSubsectionGrade
+from ..new.course_grade import CourseGrade, ZeroCourseGrade
 from ..new.course_grade_factory import CourseGradeFactory
+from ..new.subsection_grade import SubsectionGrade
 from ..new.subsection_grade_factory import SubsectionGradeFactory
 from .utils import answer_problem
 
 
 @attr(shard=1)
+@ddt.ddt
 class TestGradeIteration(SharedModuleStoreTestCase):
     """
     Test iteration through student course grades.
@@ -63,6 +69,15 @@ class TestGradeIteration(SharedModuleStoreTestCase):
         grade_results = list(CourseGradeFactory().iter([], self.course))
         self.assertEqual(grade_results, [])
 
+    def test_grade_result(self):
+        grade_result = CourseGradeFactory.GradeResult(self.students[0], None, None)
+        student, course_grade, error = grade_result
+        self.assertEqual(student, grade_result.student)
+        self.assertIsNone(course_grade)
+        self.assertIsNone(error)
+        with self.assertRaises(AttributeError):
+            grade_result.other = None
+
     def test_all_empty_grades(self):
         """
         No students have grade entries.
@@ -80,6 +95,20 @@ class TestGradeIteration(SharedModuleStoreTestCase):
             self.assertIsNone(course_grade.letter_grade)
             self.assertEqual(course_grade.percent, 0.0)
 
+    def test_course_structure_exception(self):
+        """
+        A failure to retrieve the course structure is not specific to any
+        student, so it is raised once rather than retried for each student.
+        """
+        with patch.object(
+            BlockStructureFactory,
+            'create_from_store',
+            side_effect=Exception("Error for course structure."),
+        ) as mock_create_from_store:
+            with self.assertRaises(Exception):
+                list(CourseGradeFactory().iter(self.students, self.course))
+        self.assertEquals(mock_create_from_store.call_count, 1)
+
     @patch('lms.djangoapps.grades.new.course_grade_factory.CourseGradeFactory.create')
     def test_grading_exception(self, mock_course_grade):
         """Test that we correctly capture exception messages that bubble up from
@@ -98,7 +127,7 @@ class TestGradeIteration(SharedModuleStoreTestCase):
             else mock_course_grade.return_value
             for student in self.students
         ]
-        with self.assertNumQueries(4):
+        with self.assertNumQueries(5):
             all_course_grades, all_errors = self._course_grades_and_errors_for(self.course, self.students)
         self.assertEqual(
             {student: all_errors[student].message for student in all_errors},
@@ -120,6 +149,135 @@ class TestGradeIteration(SharedModuleStoreTestCase):
         self.assertIsNotNone(all_course_grades[student2])
         self.assertIsNotNone(all_course_grades[student5])
 
+    @ddt.data((False, 'warning'), (True, 'exception'))
+    @ddt.unpack
+    @patch('lms.djangoapps.grades.new.course_grade_factory.log')
+    @patch('lms.djangoapps.grades.new.course_grade_factory.CourseGradeFactory.create')
+    def test_grading_exception_logging(self, debug_enabled, log_method, mock_course_grade, mock_log):
+        error = Exception("Error for student1.")
+        mock_course_grade.side_effect = error
+        mock_log.isEnabledFor.return_value = debug_enabled
+        list(CourseGradeFactory().iter(self.students[:1], self.course))
+        log_func = getattr(mock_log, log_method)
+        self.assertEqual(log_func.call_count, 1)
+        self.assertEqual(log_func.call_args[0][1:], (self.students[0].id, self.course.id, error))
+
+    def test_iter_persists_grades_in_batches(self):
+        with patch.object(
+            PersistentCourseGrade,
+            'bulk_update_or_create',
+            wraps=PersistentCourseGrade.bulk_update_or_create
+        ) as mock_bulk_update_or_create:
+            grade_results = list(CourseGradeFactory().iter(self.students, self.course, force_update=True, batch_size=2))
+
+        self.assertEqual(len(grade_results), 5)
+        self.assertEqual(mock_bulk_update_or_create.call_count, 3)
+        self.assertEqual(PersistentCourseGrade.objects.filter(course_id=self.course.id).count(), 5)
+        # pylint: disable=protected-access
+        for grade_result in grade_results:
+            self.assertFalse(grade_result.course_grade._subsection_grade_factory._unsaved_subsection_grades)
+
+    @patch('lms.djangoapps.grades.new.course_grade_factory.COURSE_GRADE_CHANGED.send_robust')
+    def test_iter_isolates_errors_saving_a_batch(self, mock_send_robust):
+        failing_student = self.students[2]
+        other_students = [student for student in self.students if student != failing_student]
+        bulk_create_models = SubsectionGrade.bulk_create_models
+
+        def bulk_create_models_or_fail(student, subsection_grades, course_key):
+            if student == failing_student:
+                raise IntegrityError("Duplicate subsection grade.")
+            return bulk_create_models(student, subsection_grades, course_key)
+
+        with patch.object(SubsectionGrade, 'bulk_create_models', side_effect=bulk_create_models_or_fail):
+            grade_results = list(CourseGradeFactory().iter(self.students, self.course, force_update=True))
+
+        self.assertEqual([grade_result.student for grade_result in grade_results], self.students)
+        failed_results = [grade_result for grade_result in grade_results if grade_result.error]
+        self.assertEqual(len(failed_results), 1)
+        self.assertEqual(failed_results[0].student, failing_student)
+        self.assertIsNone(failed_results[0].course_grade)
+        self.assertIsInstance(failed_results[0].error, IntegrityError)
+
+        self.assertEqual(
+            set(PersistentCourseGrade.objects.filter(course_id=self.course.id).values_list('user_id', flat=True)),
+            {student.id for student in other_students},
+        )
+        self.assertEqual([call[1]['user'] for call in mock_send_robust.call_args_list], other_students)
+
+    def test_iter_prefetches_persisted_grades(self):
+        list(CourseGradeFactory().iter(self.students, self.course, force_update=True))
+        with patch.object(
+            PersistentCourseGrade,
+            'prefetch',
+            wraps=PersistentCourseGrade.prefetch
+        ) as mock_prefetch:
+            all_course_grades, all_errors = self._course_grades_and_errors_for(self.course, self.students)
+            self.assertEquals(mock_prefetch.call_count, 1)
+
+        self.assertEqual(len(all_errors), 0)
+        self.assertEqual(len(all_course_grades), 5)
+        with self.assertNumQueries(1):
+            # the prefetched grades are cleared once iteration completes
+            PersistentCourseGrade.read(self.students[0].id, self.course.id)
+
+    def test_iter_clears_prefetched_grades_when_closed_early(self):
+        list(CourseGradeFactory().iter(self.students, self.course, force_update=True))
+        grade_results = CourseGradeFactory().iter(self.students, self.course)
+        next(grade_results)
+        grade_results.close()
+        with self.assertNumQueries(1):
+            PersistentCourseGrade.read(self.students[0].id, self.course.id)
+
+    @patch('lms.djangoapps.grades.new.course_grade_factory.COURSE_GRADE_CHANGED.send_robust')
+    def test_iter_pages_yields_saved_and_signaled_batches(self, mock_send_robust):
+        pages = CourseGradeFactory().iter_pages(self.students, self.course, force_update=True, batch_size=3)
+        first_page = next(pages)
+        self.assertEqual([grade_result.student for grade_result in first_page], self.students[:3])
+        self.assertEqual(PersistentCourseGrade.objects.filter(course_id=self.course.id).count(), 3)
+        self.assertEqual(mock_send_robust.call_count, 3)
+
+        self.assertEqual([len(page) for page in pages], [2])
+        self.assertEqual(mock_send_robust.call_count, 5)
+        self.assertEqual(
+            [call[1]['user'] for call in mock_send_robust.call_args_list],
+            self.students,
+        )
+
+    def test_iter_skips_computing_unengaged_grades(self):
+        with waffle().override(ASSUME_ZERO_GRADE_IF_ABSENT), waffle().override(WRITE_ONLY_IF_ENGAGED):
+            with patch.object(CourseGrade, 'update') as mock_update:
+                grade_results = list(CourseGradeFactory().iter(self.students, self.course, force_update=True))
+
+        self.assertFalse(mock_update.called)
+        for grade_result in grade_results:
+            self.assertIsInstance(grade_result.course_grade, ZeroCourseGrade)
+        self.assertFalse(PersistentCourseGrade.objects.filter(course_id=self.course.id).exists())
+
+    @patch('lms.djangoapps.grades.new.course_grade_factory.waffle')
+    def test_iter_looks_up_engaged_students_only_to_compute_grades(self, mock_waffle):
+        with patch.object(PersistentSubsectionGrade, 'bulk_read_user_ids') as mock_bulk_read_user_ids:
+            with patch.object(CourseGradeFactory, 'create'):
+                list(CourseGradeFactory().iter(self.students, self.course))
+
+        self.assertFalse(mock_waffle.called)
+        self.assertFalse(mock_bulk_read_user_ids.called)
+
+    @patch('lms.djangoapps.grades.new.course_grade_factory.dog_stats_api.histogram')
+    def test_iter_samples_timing(self, mock_histogram):
+        with patch.object(CourseGradeFactory, 'ITER_TIMING_SAMPLE_INTERVAL', 2):
+            list(CourseGradeFactory().iter(self.students, self.course))
+        self.assertEqual(mock_histogram.call_count, 3)
+
+    def test_iter_looks_up_config_once(self):
+        with patch(
+            'lms.djangoapps.grades.new.course_grade_factory.should_persist_grades',
+            return_value=True,
+        ) as mock_should_persist_grades:
+            grade_results = list(CourseGradeFactory().iter(self.students, self.course, force_update=True))
+
+        self.assertEqual(len(grade_results), 5)
+        self.assertEqual(mock_should_persist_grades.call_count, 1)
+
     def _course_grades_and_errors_for(self, course, students):
         """
         Simple helper method to iterate through student grades and give us
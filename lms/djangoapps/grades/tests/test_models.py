@@ -9,6 +9,7 @@ from hashlib import sha1
 
 import ddt
 import pytz
+from django.db import connection
 from django.db.utils import IntegrityError
 from django.test import TestCase
 from django.utils.timezone import now
@@ -442,6 +443,12 @@ class PersistentCourseGradesTest(GradesModelTestCase):
         with self.assertRaises(error):
             PersistentCourseGrade.update_or_create(**self.params)
 
+    def test_read_grade_loads_only_read_fields(self):
+        created_grade = PersistentCourseGrade.update_or_create(**self.params)
+        read_grade = PersistentCourseGrade.read(self.params["user_id"], self.params["course_id"])
+        with self.assertNumQueries(0):
+            self.assertEqual(unicode(read_grade), unicode(created_grade))
+
     def test_grade_does_not_exist(self):
         with self.assertRaises(PersistentCourseGrade.DoesNotExist):
             PersistentCourseGrade.read(self.params["user_id"], self.params["course_id"])
@@ -451,6 +458,60 @@ class PersistentCourseGradesTest(GradesModelTestCase):
             grade = PersistentCourseGrade.update_or_create(**self.params)
         self._assert_tracker_emitted_event(tracker_mock, grade)
 
+    def test_bulk_update_or_create(self):
+        existing_grade = PersistentCourseGrade.update_or_create(**self.params)
+        passed_timestamp = existing_grade.passed_timestamp
+        course_id = self.params.pop("course_id")
+        self.params["percent_grade"] = 88.8
+        new_params = dict(self.params, user_id=54321, passed=False)
+
+        grades = PersistentCourseGrade.bulk_update_or_create(course_id, [self.params, new_params])
+        self.assertEqual(len(grades), 2)
+
+        updated_grade = PersistentCourseGrade.read(self.params["user_id"], course_id)
+        self.assertEqual(updated_grade.id, existing_grade.id)
+        self.assertEqual(updated_grade.percent_grade, 88.8)
+        self.assertEqual(updated_grade.passed_timestamp, passed_timestamp)
+
+        created_grade = PersistentCourseGrade.read(new_params["user_id"], course_id)
+        self.assertEqual(created_grade.percent_grade, 88.8)
+        self.assertIsNone(created_grade.passed_timestamp)
+
+    def test_bulk_update_or_create_upserts_on_mysql(self):
+        course_id = self.params.pop("course_id")
+        new_params = dict(self.params, user_id=54321)
+        with patch.object(connection, 'vendor', 'mysql'), patch.object(connection, 'cursor') as mock_cursor:
+            grades = PersistentCourseGrade.bulk_update_or_create(course_id, [self.params, new_params])
+
+        self.assertEqual(len(grades), 2)
+        mock_execute = mock_cursor.return_value.__enter__.return_value.execute
+        self.assertEqual(mock_execute.call_count, 1)
+        sql, sql_params = mock_execute.call_args[0]
+        self.assertEqual(sql.count(u'%s'), len(sql_params))
+
+        quote_name = connection.ops.quote_name
+        insert_clause, update_clause = sql.split(u' ON DUPLICATE KEY UPDATE ')
+        columns = insert_clause[insert_clause.index(u'(') + 1:insert_clause.index(u')')].split(u', ')
+        fields = [field for field in PersistentCourseGrade._meta.concrete_fields if not field.primary_key]
+        self.assertEqual(columns, [quote_name(field.column) for field in fields])
+        self.assertEqual(len(sql_params), 2 * len(columns))
+        for column in (u'created', u'user_id', u'course_id'):
+            self.assertNotIn(u'{} ='.format(quote_name(column)), update_clause)
+        for column in (u'modified', u'percent_grade', u'letter_grade', u'grading_policy_hash'):
+            self.assertIn(u'{column} = VALUES({column})'.format(column=quote_name(column)), update_clause)
+        self.assertIn(
+            u'{column} = COALESCE({column}, VALUES({column}))'.format(column=quote_name(u'passed_timestamp')),
+            update_clause,
+        )
+        self.assertNotIn(
+            u'{column} = VALUES({column})'.format(column=quote_name(u'passed_timestamp')),
+            update_clause,
+        )
+
+    def test_bulk_update_or_create_empty(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(PersistentCourseGrade.bulk_update_or_create(self.course_key, []), [])
+
     def _assert_tracker_emitted_event(self, tracker_mock, grade):
         """
         Helper function to ensure that the mocked event tracker
@@ -200,6 +200,18 @@ class TestCourseGradeFactory(GradeTestBase):
         with self.assertNumQueries(6):
             _assert_create(expected_pass=False)
 
+    def test_create_with_changed_policy(self):
+        grade_factory = CourseGradeFactory()
+        with mock_get_score(1, 2):
+            grade_factory.update(self.request.user, self.course)
+
+        self._update_grading_policy(passing=0.9)
+        with patch.object(CourseGradeFactory, '_read', wraps=CourseGradeFactory._read) as mock_read:
+            with mock_get_score(1, 2):
+                course_grade = grade_factory.create(self.request.user, self.course)
+        self.assertFalse(mock_read.called)
+        self.assertIsNone(course_grade.letter_grade)
+
     @ddt.data(True, False)
     def test_create_zero(self, assume_zero_enabled):
         with waffle().override(ASSUME_ZERO_GRADE_IF_ABSENT, active=assume_zero_enabled):
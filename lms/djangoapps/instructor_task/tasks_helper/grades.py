@@ -16,7 +16,6 @@ from courseware.courses import get_course_by_id
 from instructor_analytics.basic import list_problem_responses
 from instructor_analytics.csvs import format_dictlist
 from lms.djangoapps.grades.context import grading_context, grading_context_for_course
-from lms.djangoapps.grades.models import PersistentCourseGrade
 from lms.djangoapps.grades.new.course_grade_factory import CourseGradeFactory
 from lms.djangoapps.teams.models import CourseTeamMembership
 from lms.djangoapps.verify_student.models import SoftwareSecurePhotoVerification
@@ -180,7 +179,6 @@ class _CourseGradeBulkContext(object):
         self.enrollments = _EnrollmentBulkContext(context, users)
         bulk_cache_cohorts(context.course_id, users)
         BulkRoleCache.prefetch(users)
-        PersistentCourseGrade.prefetch(context.course_id, users)
         BulkCourseTags.prefetch(context.course_id, users)
 
 
@@ -454,7 +452,7 @@ class ProblemGradeReport(object):
         CourseEnrollment.bulk_fetch_enrollment_states(enrolled_students, course_id)
 
         course = get_course_by_id(course_id)
-        for student, course_grade, error in CourseGradeFactory().iter(enrolled_students, course):
+        for student, course_grade, error in CourseGradeFactory().iter(enrolled_students.iterator(), course):
             student_fields = [getattr(student, field_name) for field_name in header_row]
             task_progress.attempted += 1
 
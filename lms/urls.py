@@ -50,9 +50,6 @@ urlpatterns = (
     url(r'', include('static_template_view.urls')),
 
     url(r'^heartbeat$', include('openedx.core.djangoapps.heartbeat.urls')),
-    #sangtest /', include('commerce.api.urls', namespace='commerce_api')),
-    url(r'^api/user_api_test/', include('user_api.urls')),
-    #endtest#
     # Note: these are older versions of the User API that will eventually be
     # subsumed by api/user listed below.
     url(r'^user_api/', include('openedx.core.djangoapps.user_api.legacy_urls')),